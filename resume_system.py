@@ -10,15 +10,34 @@ Based on the PRD requirements with 12 specialized agents.
 
 import asyncio
 import json
-from typing import Dict, List, Optional
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
 from dataclasses import dataclass
 
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.teams import SelectorGroupChat
 from autogen_agentchat.conditions import TextMentionTermination, MaxMessageTermination
 from autogen_agentchat.ui import Console
+from autogen_core import CancellationToken
+from autogen_core.models import UserMessage
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
+try:
+    import orjson  # Optional: faster parsing of JSON found in agent output
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either the same way
+json_loads = orjson.loads if orjson else json.loads
+
+# Matches JSON objects nested up to one level deep in agent output
+JSON_OBJECT_PATTERN = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+# Upper bound on how much of a message is scanned for JSON objects
+MAX_JSON_SCAN_CHARS = 200_000
+
+# OpenAI model behind every agent
+MODEL = "gpt-4o"
+
 
 # Data Models
 @dataclass
@@ -106,14 +125,22 @@ class QualityAssurance:
 class ResumeWritingSystem:
     """Main QPS Resume Writing System"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http_client: Optional[Any] = None):
         """Initialize the resume writing system"""
+        # http_client replaces the OpenAI SDK's default transport; it may be shared, so its owner closes it
+        self.owns_http_client = http_client is None
         self.model_client = OpenAIChatCompletionClient(
-            model="gpt-4o",
-            api_key=api_key
+            model=MODEL,
+            api_key=api_key,
+            http_client=http_client
         )
         self.agents = self._create_agents()
         self.team = self._create_team()
+        # SelectorGroupChat keeps its participants private, so read them once here
+        self.participant_count = len(getattr(self.team, '_participants', []))
+        self.team_type = type(self.team).__name__
+        # Caps concurrent model requests from parallel agent calls to stay inside OpenAI rate limits
+        self.request_limit = asyncio.Semaphore(4)
         
     def _create_agents(self) -> Dict[str, AssistantAgent]:
         """Create all specialized agents"""
@@ -264,6 +291,7 @@ class ResumeWritingSystem:
         agents['star_writing'] = AssistantAgent(
             name="STARWriting",
             model_client=self.model_client,
+            model_client_stream=True,  # lets create_final_resume_stream show text as it is written
             description="Structures examples using STAR methodology with clear, concise language that directly mirrors key accountabilities and LC4Q competencies",
             system_message="""You are a QPS STAR writing specialist focused on creating clear, concise examples that human reviewers can easily assess.
 
@@ -604,6 +632,20 @@ class ResumeWritingSystem:
         
         return agents
     
+    def _fresh_agent(self, agent_key: str) -> AssistantAgent:
+        """Copy an agent with an empty model context for a single standalone call"""
+        # Agents keep every message they handle, and one system can serve many users at once,
+        # so direct calls get their own copy; only the model client (and its connections) is shared
+        agent = self.agents[agent_key]
+        system_messages = getattr(agent, '_system_messages', [])
+        return AssistantAgent(
+            name=agent.name,
+            model_client=self.model_client,
+            description=agent.description,
+            system_message=system_messages[0].content if system_messages else None,
+            model_client_stream=getattr(agent, '_model_client_stream', False)
+        )
+    
     def _create_team(self) -> SelectorGroupChat:
         """Create the main team with intelligent agent selection"""
         
@@ -659,21 +701,9 @@ Select the agent that best matches the current need."""
         
         return team
     
-    async def create_resume(self, user_data: Dict, position_requirements: Dict) -> Dict:
-        """
-        Main method to create a QPS resume
-        
-        Args:
-            user_data: Dictionary containing user information
-            position_requirements: Dictionary containing position requirements including
-                                 key_accountabilities, position_description, and lc4q_competencies
-            
-        Returns:
-            Dictionary containing the complete resume and process results
-        """
-        
-        # Construct the main task
-        task = f"""
+    def _build_resume_task(self, user_data: Dict, position_requirements: Dict) -> str:
+        """Build the main resume-creation task for the team"""
+        return f"""
         Create a comprehensive QPS resume for internal promotion using Australian English and preserving authenticity:
         
         USER INFORMATION:
@@ -715,6 +745,22 @@ Select the agent that best matches the current need."""
         Continue iterating through revision cycles until all criteria are met.
         Respond with RESUME_COMPLETE only when all success criteria are satisfied.
         """
+    
+    async def create_resume(self, user_data: Dict, position_requirements: Dict) -> Dict:
+        """
+        Main method to create a QPS resume
+        
+        Args:
+            user_data: Dictionary containing user information
+            position_requirements: Dictionary containing position requirements including
+                                 key_accountabilities, position_description, and lc4q_competencies
+            
+        Returns:
+            Dictionary containing the complete resume and process results
+        """
+        
+        # Construct the main task
+        task = self._build_resume_task(user_data, position_requirements)
         
         # Execute the workflow
         result = await self.team.run(task=task)
@@ -735,58 +781,23 @@ Select the agent that best matches the current need."""
             position_requirements: Dictionary containing position requirements
         """
         
-        # Construct the main task
-        task = f"""
-        Create a comprehensive QPS resume for internal promotion using Australian English and preserving authenticity:
-        
-        USER INFORMATION:
-        {json.dumps(user_data, indent=2)}
-        
-        POSITION REQUIREMENTS:
-        Key Accountabilities: {position_requirements.get('key_accountabilities', 'Not provided')}
-        
-        Position Description: {position_requirements.get('position_description', 'Not provided')}
-        
-        Required LC4Q Competencies:
-        {position_requirements.get('lc4q_competencies', 'Not provided')}
-        
-        CRITICAL REQUIREMENTS:
-        1. PRESERVE the user's original examples - enhance them, don't replace them
-        2. Use AUSTRALIAN spelling and grammar throughout (organised, realised, recognised, etc.)
-        3. TARGET scores of 6-7 (Very Proficient to Advanced level)
-        4. Maintain authenticity whilst adding sophisticated detail
-        
-        PROCESS REQUIREMENTS:
-        1. Conduct readiness assessment using 6 key criteria
-        2. Analyse position requirements and extract Key Accountabilities
-        3. Guide example selection for optimal coverage (preserve original context)
-        4. Structure examples using STAR methodology (enhance whilst maintaining authenticity)
-        5. Score all examples (target 6-7 in Context, Complexity, Initiative)
-        6. Verify all LC4Q competencies are demonstrated
-        7. Articulate transferable skills explicitly using Australian English
-        8. Perform comprehensive quality assurance including Australian language check
-        
-        SUCCESS CRITERIA:
-        - All examples score 6-7 in Context, Complexity, and Initiative
-        - 100% coverage of relevant Key Accountabilities
-        - 100% coverage of required LC4Q competencies
-        - Australian spelling and grammar throughout
-        - Authentic examples preserved and enhanced
-        - Professional format and presentation
-        - Clear transferable skills articulation
-        
-        Continue iterating through revision cycles until all criteria are met.
-        Respond with RESUME_COMPLETE only when all success criteria are satisfied.
-        """
-        
         # Execute with console output
-        await Console(self.team.run_stream(task=task))
+        await Console(self.create_resume_stream(user_data, position_requirements))
+    
+    def create_resume_stream(self, user_data: Dict, position_requirements: Dict):
+        """Stream the resume-creation conversation, ending with the TaskResult"""
+        return self.team.run_stream(task=self._build_resume_task(user_data, position_requirements))
     
     async def score_initial_example(self, user_data: Dict, position_requirements: Dict) -> Dict:
         """Score the initial job example provided by the user"""
-        
-        task = f"""
-        Score the initial job example provided by the user against the position requirements.
+        # The three scoring areas are independent, so they are scored concurrently
+        # rather than taking turns in a selector group chat
+        return await self.score_all(user_data, position_requirements)
+    
+    def _build_scoring_task(self, user_data: Dict, position_requirements: Dict) -> str:
+        """Build the task sent to each scoring agent"""
+        return f"""
+        Score the user's job example against the position requirements.
         
         USER INFORMATION:
         {json.dumps(user_data, indent=2)}
@@ -799,44 +810,59 @@ Select the agent that best matches the current need."""
         Required LC4Q Competencies:
         {position_requirements.get('lc4q_competencies', 'Not provided')}
         
-        SCORING TASK:
-        Use the Context, Complexity, and Initiative scoring agents to evaluate the user's job example.
-        
-        For each scoring area, provide:
-        1. Score (1-7 scale)
-        2. Detailed feedback explaining the score
-        3. Specific suggestions for improvement
-        
-        Return results in JSON format with all scoring details.
-        Respond with SCORING_COMPLETE when finished.
+        Provide your score (1-7 scale), detailed feedback explaining the score and specific
+        suggestions for improvement in the exact JSON format specified in your system message.
         """
+    
+    def build_scoring_requests(self, user_data: Dict, position_requirements: Dict) -> Dict[str, Dict]:
+        """Build a chat completion request body per scoring agent, keyed by agent name (e.g. for the Batch API)"""
+        task = self._build_scoring_task(user_data, position_requirements)
+        requests = {}
+        for agent_key in ('context_scoring', 'complexity_scoring', 'initiative_scoring'):
+            agent = self.agents[agent_key]
+            # AssistantAgent keeps its system message private, so it is read the same way as the team's participants
+            system_messages = getattr(agent, '_system_messages', [])
+            requests[agent.name] = {
+                "model": MODEL,
+                "messages": [{"role": "system", "content": message.content} for message in system_messages]
+                            + [{"role": "user", "content": task}]
+            }
+        return requests
+    
+    def score_from_responses(self, responses: Dict[str, str]) -> Dict:
+        """Extract scores from raw scoring-agent replies keyed by agent name"""
+        from autogen_agentchat.messages import TextMessage
         
-        # Create a smaller team for scoring only
-        scoring_agents = [
-            self.agents['orchestrator'],
-            self.agents['context_scoring'],
-            self.agents['complexity_scoring'],
-            self.agents['initiative_scoring']
-        ]
+        messages = [TextMessage(content=content, source=name) for name, content in responses.items()]
+        return self._extract_scoring_results(messages)
+    
+    async def score_all(self, user_data: Dict, position_requirements: Dict) -> Dict:
+        """Score the initial job example with the three scoring agents concurrently"""
+        task = self._build_scoring_task(user_data, position_requirements)
         
-        scoring_team = SelectorGroupChat(
-            participants=scoring_agents,
-            model_client=self.model_client,
-            termination_condition=TextMentionTermination("SCORING_COMPLETE"),
-            allow_repeated_speaker=True,
-            max_turns=20
-        )
+        from autogen_agentchat.messages import TextMessage
         
-        result = await scoring_team.run(task=task)
+        async def score_with(agent_key):
+            message = TextMessage(content=task, source="user")
+            async with self.request_limit:
+                response = await self._fresh_agent(agent_key).on_messages([message], None)
+            return response.chat_message
+        
+        # The scoring agents share no state, so all three requests can be in flight at once
+        context, complexity, initiative = await asyncio.gather(
+            score_with('context_scoring'),
+            score_with('complexity_scoring'),
+            score_with('initiative_scoring')
+        )
+        messages = [context, complexity, initiative]
         
-        # Extract actual scoring results from agent conversation
-        scoring_results = self._extract_scoring_results(result.messages)
+        scoring_results = self._extract_scoring_results(messages)
         
         return {
             "success": True,
-            "messages": result.messages,
-            "stop_reason": result.stop_reason,
-            **scoring_results  # Merge the extracted scoring data
+            "messages": messages,
+            "stop_reason": "parallel_scoring_complete",
+            **scoring_results
         }
     
     async def rewrite_example(self, user_data: Dict, position_requirements: Dict, initial_scores: Dict) -> Dict:
@@ -885,7 +911,7 @@ Select the agent that best matches the current need."""
         """
         
         # Use the STARWriting agent directly - no need for group chat
-        star_agent = self.agents['star_writing']
+        star_agent = self._fresh_agent('star_writing')
         
         # Create a simple message to the agent
         from autogen_agentchat.messages import TextMessage
@@ -912,8 +938,26 @@ Select the agent that best matches the current need."""
             **rewritten_content  # Merge the extracted content
         }
     
-    async def create_final_resume(self, user_data: Dict, position_requirements: Dict, rewritten_example: Dict, user_feedback: str) -> Dict:
-        """Create the final resume incorporating user feedback"""
+    async def create_final_resume(self, user_data: Dict, position_requirements: Dict, rewritten_example: Dict, user_feedback: str, timeout: Optional[float] = None, on_text: Optional[Callable[[str], None]] = None) -> Dict:
+        """Create the final resume incorporating user feedback (raises asyncio.TimeoutError after timeout seconds)"""
+        cancellation_token = CancellationToken()
+        
+        async def collect():
+            async for item in self.create_final_resume_stream(user_data, position_requirements, rewritten_example, user_feedback, cancellation_token):
+                if isinstance(item, dict):
+                    return item
+                if on_text:
+                    on_text(item)
+        
+        try:
+            return await asyncio.wait_for(collect(), timeout=timeout)
+        except asyncio.TimeoutError:
+            # Abort the in-flight model request instead of leaving it running unobserved
+            cancellation_token.cancel()
+            raise
+    
+    async def create_final_resume_stream(self, user_data: Dict, position_requirements: Dict, rewritten_example: Dict, user_feedback: str, cancellation_token: Optional[CancellationToken] = None) -> AsyncIterator[Union[str, Dict]]:
+        """Create the final resume, yielding the agent's text as it is written and then the result dict"""
         
         # If user provided feedback, first rewrite the example with that feedback
         final_example = rewritten_example
@@ -956,11 +1000,17 @@ Select the agent that best matches the current need."""
             """
             
             # Use STARWriting agent to apply feedback
-            star_agent = self.agents['star_writing']
+            star_agent = self._fresh_agent('star_writing')
             
-            from autogen_agentchat.messages import TextMessage
+            from autogen_agentchat.base import Response
+            from autogen_agentchat.messages import ModelClientStreamingChunkEvent, TextMessage
             message = TextMessage(content=feedback_task, source="user")
-            feedback_result = await star_agent.on_messages([message], None)
+            feedback_result = None
+            async for event in star_agent.on_messages_stream([message], cancellation_token or CancellationToken()):
+                if isinstance(event, ModelClientStreamingChunkEvent):
+                    yield event.content
+                elif isinstance(event, Response):
+                    feedback_result = event.chat_message
             
             # Extract the feedback-improved example
             class SimpleResult:
@@ -980,7 +1030,7 @@ Select the agent that best matches the current need."""
                     'improvements_made': feedback_content.get('improvements_made', []) + ['Applied user feedback for clarity and language alignment']
                 }
         
-        return {
+        yield {
             "success": True,
             "final_example": final_example,
             "user_feedback_applied": user_feedback,
@@ -989,7 +1039,6 @@ Select the agent that best matches the current need."""
     
     def _extract_rewrite_results(self, messages, original_example):
         """Extract structured results from the rewrite agent conversation"""
-        import re
         
         # Initialize results structure
         extracted_results = {
@@ -1048,10 +1097,10 @@ Select the agent that best matches the current need."""
         
         if star_content:
             # Method 1: Look for JSON structure first
-            json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', star_content, re.DOTALL)
+            json_matches = JSON_OBJECT_PATTERN.findall(star_content[:MAX_JSON_SCAN_CHARS])
             for json_str in json_matches:
                 try:
-                    parsed = json.loads(json_str)
+                    parsed = json_loads(json_str)
                     if isinstance(parsed, dict):
                         # Update with any STAR components found
                         if 'year_rank_location' in parsed:
@@ -1173,11 +1222,10 @@ Select the agent that best matches the current need."""
             # Look for JSON scoring content
             if '{' in content and '}' in content:
                 try:
-                    import re
-                    json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
+                    json_matches = JSON_OBJECT_PATTERN.findall(content[:MAX_JSON_SCAN_CHARS])
                     for json_str in json_matches:
                         try:
-                            parsed = json.loads(json_str)
+                            parsed = json_loads(json_str)
                             if isinstance(parsed, dict):
                                 # Extract context scoring
                                 if source == 'ContextScoring' or 'context_score' in parsed:
@@ -1211,15 +1259,15 @@ Select the agent that best matches the current need."""
             # Look for score patterns in text
             if source in ['ContextScoring', 'ComplexityScoring', 'InitiativeScoring']:
                 # Extract scores from text patterns like "Score: 4/7" or "context_score: 5"
-                import re
                 score_patterns = [
                     r'score[:\s]*(\d+)',
                     r'(\d+)/7',
                     r'(\d+)\s*out\s*of\s*7'
                 ]
                 
+                lower_content = content.lower()
                 for pattern in score_patterns:
-                    matches = re.findall(pattern, content.lower())
+                    matches = re.findall(pattern, lower_content)
                     if matches:
                         try:
                             score = int(matches[0])
@@ -1236,9 +1284,19 @@ Select the agent that best matches the current need."""
         
         return scoring_data
     
+    async def warm_up(self):
+        """Open a pooled API connection ahead of the first agent call"""
+        # A one-token completion through the public client API completes DNS, TCP and TLS setup for the pool
+        await self.model_client.create(
+            [UserMessage(content="ping", source="user")],
+            extra_create_args={"max_tokens": 1}
+        )
+    
     async def close(self):
         """Clean up resources"""
-        await self.model_client.close()
+        # Closing the model client also closes its HTTP client, which is only ours if we created it
+        if self.owns_http_client:
+            await self.model_client.close()
 
 
 # Example usage and testing
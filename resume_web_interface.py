@@ -7,13 +7,29 @@ A simple web interface using Streamlit for the resume writing system.
 
 import streamlit as st
 import asyncio
+import concurrent.futures
+import hashlib
 import json
+import logging
 import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
 from datetime import datetime
-from resume_system import ResumeWritingSystem
-import PyPDF2
-from docx import Document
 import io
+import zipfile
+from xml.etree import ElementTree
+
+try:
+    import orjson  # Optional: much faster JSON encoding and decoding
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError (a ValueError), so callers catch either the same way
+json_loads = orjson.loads if orjson else json.loads
 
 # Configure Streamlit page
 st.set_page_config(
@@ -23,8 +39,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+logger = logging.getLogger(__name__)
+
+# download_button accepts a callable for data (generated on click) from Streamlit 1.52
+DEFERRED_DOWNLOADS = tuple(int(part) for part in st.__version__.split(".")[:2]) >= (1, 52)
+
+# Show step-by-step diagnostics (and full tracebacks) while creating the final resume
+DEBUG = os.getenv("RESUME_SYSTEM_DEBUG", "false").lower() in ("1", "true", "yes")
+
 # Custom CSS for better styling
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -62,66 +86,146 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-def extract_text_from_pdf(uploaded_file):
-    """Extract text from uploaded PDF file"""
-    try:
-        pdf_reader = PyPDF2.PdfReader(uploaded_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        st.error(f"Error reading PDF file: {str(e)}")
-        return None
+# LC4Q section header, and the same header with the paste instructions in one element
+LC4Q_HEADER = '<h3 class="section-header">🏆 LC4Q Competencies Required</h3>'
+LC4Q_PASTE_HEADER = LC4Q_HEADER + "\n\nCopy and paste the specific LC4Q competencies required for this position and rank level:"
+
+# Matches JSON objects nested up to one level deep in agent output
+JSON_OBJECT_PATTERN = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}')
+# Upper bound on how much of a message is scanned for JSON objects
+MAX_JSON_SCAN_CHARS = 200_000
+
+# Lower-case markers that classify agent messages in extract_final_resume_content
+STAR_TAGS = ('situation:', 'task:', 'action:', 'result:')
+SCORING_AREAS = ('context', 'complexity', 'initiative')
+COMPETENCY_TERMS = ('lc4q', 'vision', 'results', 'accountability')
+
+# WordprocessingML namespace used for tags in word/document.xml
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Poppler's pdftotext, preferred for PDFs when it is installed
+PDFTOTEXT = shutil.which("pdftotext")
+
+# Workflow stages in order, as (session stage key, sidebar label)
+WORKFLOW_STAGES = (
+    ('input', '📝 Step 1: Input Information'),
+    ('initial_scoring', '📊 Step 2: Initial Scoring'),
+    ('rewrite', '✏️ Step 3: Improve Example'),
+    ('feedback', '💬 Step 4: Your Feedback'),
+    ('final', '🎯 Step 5: Final Resume')
+)
+
+# Conversation log paging: messages per page and characters shown per message
+MESSAGES_PER_PAGE = 10
+MAX_MESSAGE_PREVIEW_CHARS = 4000
+
+# Final example fields in display order, as (label, rewritten_example key)
+STAR_SECTIONS = (
+    ("Year, Rank, Location", 'year_rank_location'),
+    ("Situation", 'situation'),
+    ("Task", 'task'),
+    ("Action", 'action'),
+    ("Result", 'result')
+)
+
+# Icon shown next to each LC4Q competency category
+CATEGORY_ICONS = {
+    'Vision': '🔮',
+    'Results': '🎯',
+    'Accountability': '⚖️'
+}
+
+def extract_text_with_pdftotext(file_bytes):
+    """Extract text from the contents of a PDF file with Poppler's pdftotext"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "upload.pdf")
+        with open(pdf_path, "wb") as pdf_file:
+            pdf_file.write(file_bytes)
+        completed = subprocess.run(
+            [PDFTOTEXT, "-enc", "UTF-8", pdf_path, "-"],
+            capture_output=True, check=True, timeout=30
+        )
+    
+    # pdftotext ends every page with a form feed
+    return completed.stdout.decode("utf-8", errors="replace").replace("\f", "\n").strip()
 
-def extract_text_from_docx(uploaded_file):
-    """Extract text from uploaded DOCX file"""
+def extract_text_from_pdf(file_bytes):
+    """Extract text from the contents of a PDF file"""
+    if PDFTOTEXT:
+        try:
+            return extract_text_with_pdftotext(file_bytes)
+        except (OSError, subprocess.SubprocessError):
+            logger.warning("pdftotext failed, falling back to PyMuPDF", exc_info=True)
+    
+    # Imported on first use so sessions that never upload a PDF don't load MuPDF
+    import pymupdf
+    
     try:
-        doc = Document(uploaded_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        with pymupdf.open(stream=file_bytes, filetype="pdf") as doc:
+            # Pages with no content stream (blank separator pages) have nothing to extract
+            return "\n".join(page.get_text("text") for page in doc if page.get_contents()).strip()
     except Exception as e:
-        st.error(f"Error reading DOCX file: {str(e)}")
-        return None
+        raise ValueError(f"Error reading PDF file: {str(e)}") from e
 
-def extract_text_from_txt(uploaded_file):
-    """Extract text from uploaded TXT file"""
+def extract_text_from_docx(file_bytes):
+    """Extract text from the contents of a DOCX file"""
     try:
-        # Convert bytes to string
-        text = str(uploaded_file.read(), "utf-8")
-        return text.strip()
+        # Stream word/document.xml directly rather than building python-docx's object model
+        paragraphs = []
+        runs = []
+        with zipfile.ZipFile(io.BytesIO(file_bytes)) as docx, docx.open("word/document.xml") as document_xml:
+            for _, element in ElementTree.iterparse(document_xml):
+                if element.tag == WORD_NS + "t":
+                    runs.append(element.text or "")
+                elif element.tag == WORD_NS + "tab":
+                    runs.append("\t")
+                elif element.tag in (WORD_NS + "br", WORD_NS + "cr"):
+                    runs.append("\n")
+                elif element.tag == WORD_NS + "p":
+                    paragraphs.append("".join(runs))
+                    runs = []
+                    element.clear()
+        return "\n".join(paragraphs).strip()
     except Exception as e:
-        st.error(f"Error reading TXT file: {str(e)}")
-        return None
+        raise ValueError(f"Error reading DOCX file: {str(e)}") from e
 
-def process_uploaded_file(uploaded_file):
-    """Process uploaded file and extract text based on file type"""
-    if uploaded_file is None:
-        return None
-    
-    file_type = uploaded_file.type
-    file_name = uploaded_file.name.lower()
-    
+def extract_text_from_txt(file_bytes):
+    """Extract text from the contents of a TXT file"""
+    # Undecodable bytes (e.g. from Windows-1252 exports) become U+FFFD instead of failing the upload
+    return file_bytes.decode("utf-8", errors="replace").strip()
+
+@st.cache_data(show_spinner=False)
+def extract_text(file_bytes, file_name, file_type):
+    """Extract text from an uploaded file's contents based on file type"""
+    # Keyed on the file contents, so reruns with the same upload skip parsing
     if file_type == "application/pdf" or file_name.endswith('.pdf'):
-        return extract_text_from_pdf(uploaded_file)
+        return extract_text_from_pdf(file_bytes)
     elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or file_name.endswith('.docx'):
-        return extract_text_from_docx(uploaded_file)
+        return extract_text_from_docx(file_bytes)
     elif file_type == "text/plain" or file_name.endswith('.txt'):
-        return extract_text_from_txt(uploaded_file)
+        return extract_text_from_txt(file_bytes)
     else:
-        st.error(f"Unsupported file type: {file_type}. Please upload PDF, DOCX, or TXT files.")
-        return None
+        raise ValueError(f"Unsupported file type: {file_type}. Please upload PDF, DOCX, or TXT files.")
+
+async def extract_uploads(uploaded_files):
+    """Extract text from several uploaded files in parallel"""
+    # One combined document is often uploaded for several fields, so each distinct file is parsed once
+    digests = [hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).digest() for uploaded_file in uploaded_files]
+    distinct_files = dict(zip(digests, uploaded_files))
+    
+    # Worker threads can't draw on the page, so failures come back as exceptions for the caller
+    results = await asyncio.gather(
+        *(asyncio.to_thread(extract_text, uploaded_file.getvalue(), uploaded_file.name.lower(), uploaded_file.type)
+          for uploaded_file in distinct_files.values()),
+        return_exceptions=True
+    )
+    results_by_digest = dict(zip(distinct_files, results))
+    return [results_by_digest[digest] for digest in digests]
 
 def initialize_session_state():
     """Initialize session state variables"""
-    if 'resume_system' not in st.session_state:
-        st.session_state.resume_system = None
-    if 'system_initialized' not in st.session_state:
-        st.session_state.system_initialized = False
     if 'resume_result' not in st.session_state:
         st.session_state.resume_result = None
     if 'processing' not in st.session_state:
@@ -136,7 +240,10 @@ def initialize_session_state():
         st.session_state.user_feedback = ""
     if 'final_result' not in st.session_state:
         st.session_state.final_result = None
+    if 'final_result_time' not in st.session_state:
+        st.session_state.final_result_time = None
 
+@st.cache_data(show_spinner=False)
 def check_api_key():
     """Check if OpenAI API key is available"""
     api_key = os.getenv("OPENAI_API_KEY")
@@ -148,27 +255,137 @@ def check_api_key():
             return None
     return api_key
 
-async def initialize_system():
-    """Initialize the resume writing system"""
+@st.cache_resource(show_spinner=False)
+def get_resume_system(api_key):
+    """Create the resume writing system once per API key"""
+    # Shared by every session: its model client and connections are reused, while each agent call
+    # runs on a fresh copy of the agent so no session sees another's conversation
+    # Imported here so reruns that never reach an agent call skip loading AutoGen/OpenAI
+    from resume_system import ResumeWritingSystem
+    return ResumeWritingSystem(api_key=api_key)
+
+@st.cache_resource(show_spinner=False)
+def get_agent_loop():
+    """Start the event loop that every agent call runs on"""
+    # The resume system is shared process-wide, so its OpenAI client (and the HTTP connections
+    # it keeps alive) must stay on one loop rather than a new asyncio.run() loop per call
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="agent-loop", daemon=True).start()
+    return loop
+
+def run_on_agent_loop(coro):
+    """Run a coroutine on the shared agent loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, get_agent_loop()).result()
+
+def build_cache_key(*inputs):
+    """Serialise the inputs of an LLM call into a stable cache key"""
+    # sort_keys makes equal dicts hash identically; default=str covers agent message objects
+    return json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def cached_score_example(cache_key, _user_data, _position_requirements):
+    """Score an example, reusing the result for identical inputs"""
+    system = get_resume_system(check_api_key())
+    return run_on_agent_loop(system.score_all(_user_data, _position_requirements))
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def cached_rewrite_example(cache_key, _user_data, _position_requirements, _initial_scores):
+    """Rewrite an example, reusing the result for identical inputs"""
+    system = get_resume_system(check_api_key())
+    return run_on_agent_loop(system.rewrite_example(_user_data, _position_requirements, _initial_scores))
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def cached_final_resume(cache_key, _user_data, _position_requirements, _rewritten_example, _user_feedback, _on_text=None):
+    """Create the final resume, reusing the result for identical inputs"""
+    system = get_resume_system(check_api_key())
+    # The timeout is applied on the agent loop so an overrunning request is cancelled, not abandoned
+    return run_on_agent_loop(system.create_final_resume(
+        _user_data, _position_requirements, _rewritten_example, _user_feedback,
+        timeout=300,  # 5 minute timeout
+        on_text=_on_text
+    ))
+
+@st.cache_resource(show_spinner=False)
+def get_background_executor(role):
+    """Shared worker pool, one per role, for agent calls that run alongside the script"""
+    # Each role gets its own pool, so a busy one never holds up another role's work
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"agent-{role}")
+
+def run_stage_coroutine(coro, timeout):
+    """Run a stage coroutine to completion from the script thread"""
     try:
-        api_key = check_api_key()
-        if not api_key:
-            st.error("⚠️ OpenAI API key not found. Please set OPENAI_API_KEY environment variable or add it to Streamlit secrets.")
-            return False
-        
-        if not st.session_state.system_initialized:
-            st.session_state.resume_system = ResumeWritingSystem(api_key=api_key)
-            st.session_state.system_initialized = True
-        
-        return True
-    except Exception as e:
-        st.error(f"❌ Failed to initialize system: {str(e)}")
-        return False
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # Streamlit runs scripts outside any event loop, so this is the usual path
+        return asyncio.run(coro)
+    # A loop is already running here, so hand the coroutine to a worker thread instead
+    return get_background_executor("stage").submit(asyncio.run, coro).result(timeout=timeout)
+
+def prefetch_rewrite(user_data, position_requirements, initial_scores):
+    """Start the rewrite in the background while the user reads their scores"""
+    cache_key = build_cache_key(user_data, position_requirements, initial_scores)
+    if st.session_state.get('rewrite_prefetch_key') == cache_key:
+        return
+    
+    # The cache holds a per-key lock while computing, so rewrite_example() waits for
+    # this call instead of starting a second one, then reads its result from the cache
+    get_background_executor("prefetch").submit(
+        cached_rewrite_example, cache_key, user_data, position_requirements, initial_scores
+    )
+    st.session_state.rewrite_prefetch_key = cache_key
+
+def make_json_serializable(obj):
+    """Recursively convert objects to JSON serializable format"""
+    # Plain values (most of a message log) are returned before any attribute probing
+    if isinstance(obj, (str, int, float, bool, type(None))):
+        return obj
+    elif hasattr(obj, '__dict__'):
+        # Convert objects with attributes to dictionaries
+        return {key: make_json_serializable(value) for key, value in obj.__dict__.items()}
+    elif hasattr(obj, 'content') and hasattr(obj, 'source'):
+        # Handle message objects specifically
+        return {
+            "content": str(getattr(obj, 'content', '')),
+            "source": str(getattr(obj, 'source', 'Unknown')),
+            "object_type": str(type(obj).__name__)
+        }
+    elif isinstance(obj, dict):
+        return {key: make_json_serializable(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [make_json_serializable(item) for item in obj]
+    else:
+        # Convert any other object to string
+        return str(obj)
+
+def dump_json(obj, pretty=False):
+    """Serialise an object to JSON bytes (compact unless pretty), using orjson when it is installed"""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, default=str, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=str).encode("utf-8")
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode("utf-8")
+
+def build_download_package(download_data, pretty=False):
+    """Serialise the complete download package"""
+    return dump_json(make_json_serializable(download_data), pretty)
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def serialize_download(cache_key, _download_data, pretty=False):
+    """Serialise the download package once per set of inputs"""
+    return build_download_package(_download_data, pretty)
+
+def inject_custom_css():
+    """Inject the custom CSS into the page"""
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 def display_header():
     """Display the main header"""
-    st.markdown('<h1 class="main-header">👮‍♂️ QPS Resume Writing System</h1>', unsafe_allow_html=True)
-    st.markdown('<div class="info-box">Intelligent multi-agent system for creating compelling QPS promotion resumes</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<h1 class="main-header">👮‍♂️ QPS Resume Writing System</h1>'
+        '<div class="info-box">Intelligent multi-agent system for creating compelling QPS promotion resumes</div>',
+        unsafe_allow_html=True
+    )
 
 def collect_user_data():
     """Collect user data through the interface"""
@@ -184,23 +401,55 @@ def collect_user_data():
         "job_example": job_example
     }
 
-def collect_position_requirements():
-    """Collect position requirements"""
-    st.markdown('<h2 class="section-header">📄 Position Requirements</h2>', unsafe_allow_html=True)
+def select_input_methods():
+    """Choose how each position document will be provided"""
+    # Rendered outside the input form: widgets inside a form don't rerun the page,
+    # so the matching text box or uploader would only appear after submitting
+    col1, col2, col3 = st.columns(3)
     
-    # Key Accountabilities
-    st.markdown('<h3 class="section-header">🎯 Key Accountabilities</h3>', unsafe_allow_html=True)
+    with col1:
+        ka_input_method = st.radio(
+            "How would you like to provide Key Accountabilities?",
+            ["Type/Paste Text", "Upload File"],
+            key="ka_input_method",
+            horizontal=True
+        )
+    
+    with col2:
+        pd_input_method = st.radio(
+            "How would you like to provide Position Description?",
+            ["Type/Paste Text", "Upload File"],
+            key="pd_input_method",
+            horizontal=True
+        )
     
-    # Option to choose input method
-    ka_input_method = st.radio(
-        "How would you like to provide Key Accountabilities?",
-        ["Type/Paste Text", "Upload File"],
-        key="ka_input_method",
-        horizontal=True
+    with col3:
+        lc4q_input_method = st.radio(
+            "How would you like to provide LC4Q Competencies?",
+            ["Type/Paste Text", "Upload File"],
+            key="lc4q_input_method",
+            horizontal=True
+        )
+    
+    return {
+        "key_accountabilities": ka_input_method,
+        "position_description": pd_input_method,
+        "lc4q_competencies": lc4q_input_method
+    }
+
+def collect_position_requirements(input_methods):
+    """Collect position requirements"""
+    uploads = {}  # field -> (uploaded file, placeholder, preview label, preview height)
+    
+    # Section header and the first subsection header share one markdown element
+    st.markdown(
+        '<h2 class="section-header">📄 Position Requirements</h2>'
+        '<h3 class="section-header">🎯 Key Accountabilities</h3>',
+        unsafe_allow_html=True
     )
     
     key_accountabilities = ""
-    if ka_input_method == "Type/Paste Text":
+    if input_methods["key_accountabilities"] == "Type/Paste Text":
         key_accountabilities = st.text_area(
             "List the key accountabilities for the target position:",
             height=150,
@@ -219,26 +468,13 @@ def collect_position_requirements():
             key="ka_file_uploader"
         )
         if uploaded_ka_file is not None:
-            extracted_text = process_uploaded_file(uploaded_ka_file)
-            if extracted_text:
-                key_accountabilities = extracted_text
-                st.success(f"✅ Successfully extracted text from {uploaded_ka_file.name}")
-                with st.expander("Preview extracted text"):
-                    st.text_area("Extracted Key Accountabilities:", value=extracted_text, height=150, disabled=True)
+            uploads["key_accountabilities"] = (uploaded_ka_file, st.container(), "Extracted Key Accountabilities:", 150)
     
     # Position Description
     st.markdown('<h3 class="section-header">📋 Position Description</h3>', unsafe_allow_html=True)
     
-    # Option to choose input method
-    pd_input_method = st.radio(
-        "How would you like to provide Position Description?",
-        ["Type/Paste Text", "Upload File"],
-        key="pd_input_method",
-        horizontal=True
-    )
-    
     position_description = ""
-    if pd_input_method == "Type/Paste Text":
+    if input_methods["position_description"] == "Type/Paste Text":
         position_description = st.text_area(
             "Provide the general position description and operational requirements:",
             height=150,
@@ -261,27 +497,12 @@ OPERATIONAL REQUIREMENTS:
             key="pd_file_uploader"
         )
         if uploaded_pd_file is not None:
-            extracted_text = process_uploaded_file(uploaded_pd_file)
-            if extracted_text:
-                position_description = extracted_text
-                st.success(f"✅ Successfully extracted text from {uploaded_pd_file.name}")
-                with st.expander("Preview extracted text"):
-                    st.text_area("Extracted Position Description:", value=extracted_text, height=150, disabled=True)
+            uploads["position_description"] = (uploaded_pd_file, st.container(), "Extracted Position Description:", 150)
     
     # LC4Q Competencies
-    st.markdown('<h3 class="section-header">🏆 LC4Q Competencies Required</h3>', unsafe_allow_html=True)
-    
-    # Option to choose input method
-    lc4q_input_method = st.radio(
-        "How would you like to provide LC4Q Competencies?",
-        ["Type/Paste Text", "Upload File"],
-        key="lc4q_input_method",
-        horizontal=True
-    )
-    
     lc4q_competencies = ""
-    if lc4q_input_method == "Type/Paste Text":
-        st.markdown("Copy and paste the specific LC4Q competencies required for this position and rank level:")
+    if input_methods["lc4q_competencies"] == "Type/Paste Text":
+        st.markdown(LC4Q_PASTE_HEADER, unsafe_allow_html=True)
         lc4q_competencies = st.text_area(
             "LC4Q Competencies (copy from position description or competency framework):",
             height=200,
@@ -304,41 +525,46 @@ Accountability:
 - Pursues continuous growth"""
         )
     else:
+        st.markdown(LC4Q_HEADER, unsafe_allow_html=True)
         uploaded_lc4q_file = st.file_uploader(
             "Upload LC4Q Competencies file (PDF, DOCX, or TXT)",
             type=['pdf', 'docx', 'txt'],
             key="lc4q_file_uploader"
         )
         if uploaded_lc4q_file is not None:
-            extracted_text = process_uploaded_file(uploaded_lc4q_file)
-            if extracted_text:
-                lc4q_competencies = extracted_text
-                st.success(f"✅ Successfully extracted text from {uploaded_lc4q_file.name}")
-                with st.expander("Preview extracted text"):
-                    st.text_area("Extracted LC4Q Competencies:", value=extracted_text, height=200, disabled=True)
+            uploads["lc4q_competencies"] = (uploaded_lc4q_file, st.container(), "Extracted LC4Q Competencies:", 200)
     
-    return {
+    requirements = {
         "key_accountabilities": key_accountabilities,
         "position_description": position_description,
         "lc4q_competencies": lc4q_competencies
     }
+    
+    # Extract all uploaded files together, then report back in each section's placeholder
+    if uploads:
+        extracted = asyncio.run(extract_uploads([upload[0] for upload in uploads.values()]))
+        for (field, (uploaded_file, placeholder, preview_label, preview_height)), text in zip(uploads.items(), extracted):
+            with placeholder:
+                if isinstance(text, Exception):
+                    st.error(str(text))
+                elif text:
+                    requirements[field] = text
+                    st.success(f"✅ Successfully extracted text from {uploaded_file.name}")
+                    with st.expander("Preview extracted text"):
+                        st.text_area(preview_label, value=text, height=preview_height, disabled=True)
+    
+    return requirements
 
 async def score_initial_example(user_data, position_requirements):
     """Score the initial job example provided by the user"""
     try:
-        if not await initialize_system():
-            return None
-        
-        progress_placeholder = st.empty()
-        status_placeholder = st.empty()
-        
-        progress_placeholder.progress(0.2)
-        status_placeholder.info("📊 Scoring initial example...")
-        
-        result = await st.session_state.resume_system.score_initial_example(user_data, position_requirements)
-        
-        progress_placeholder.progress(1.0)
-        status_placeholder.success("✅ Initial scoring completed!")
+        with st.status("📊 Scoring initial example...", state="running") as status:
+            result = await asyncio.to_thread(
+                cached_score_example,
+                build_cache_key(user_data, position_requirements),
+                user_data, position_requirements
+            )
+            status.update(label="✅ Initial scoring completed!", state="complete")
         
         return result
         
@@ -349,19 +575,13 @@ async def score_initial_example(user_data, position_requirements):
 async def rewrite_example(user_data, position_requirements, initial_scores):
     """Rewrite the example to better meet position requirements"""
     try:
-        if not await initialize_system():
-            return None
-        
-        progress_placeholder = st.empty()
-        status_placeholder = st.empty()
-        
-        progress_placeholder.progress(0.5)
-        status_placeholder.info("✏️ Rewriting example to improve scores...")
-        
-        result = await st.session_state.resume_system.rewrite_example(user_data, position_requirements, initial_scores)
-        
-        progress_placeholder.progress(1.0)
-        status_placeholder.success("✅ Example rewrite completed!")
+        with st.status("✏️ Rewriting example to improve scores...", state="running") as status:
+            result = await asyncio.to_thread(
+                cached_rewrite_example,
+                build_cache_key(user_data, position_requirements, initial_scores),
+                user_data, position_requirements, initial_scores
+            )
+            status.update(label="✅ Example rewrite completed!", state="complete")
         
         return result
         
@@ -369,13 +589,56 @@ async def rewrite_example(user_data, position_requirements, initial_scores):
         st.error(f"❌ Error during example rewrite: {str(e)}")
         return None
 
+def drain_text_chunks(text_chunks):
+    """Take all the text currently waiting in a queue of streamed chunks"""
+    pieces = []
+    while True:
+        try:
+            pieces.append(text_chunks.get_nowait())
+        except queue.Empty:
+            return "".join(pieces)
+
+def display_final_resume_diagnostics(user_data, position_requirements, rewritten_example, user_feedback):
+    """Show diagnostic information before creating the final resume (debug mode only)"""
+    st.write("🔍 **Diagnostic Information:**")
+    
+    # 1. Input data
+    st.write("**Step 1: Input Validation**")
+    st.success("✅ All input data present")
+    st.write(f"- User data keys: {list(user_data.keys())}")
+    st.write(f"- Position req keys: {list(position_requirements.keys())}")
+    st.write(f"- Rewritten example keys: {list(rewritten_example.keys())}")
+    st.write(f"- User feedback length: {len(user_feedback) if user_feedback else 0}")
+    
+    # 2. Check event loop status
+    st.write("**Step 2: Event Loop Diagnostics**")
+    try:
+        current_loop = asyncio.get_running_loop()
+        st.write(f"- Script loop: {current_loop}")
+        st.write(f"- Agent loop running: {get_agent_loop().is_running()}")
+    except Exception as e:
+        st.error(f"❌ Event loop check failed: {e}")
+    
+    # 3. System lookup
+    st.write("**Step 3: System Initialization**")
+    system = get_resume_system(check_api_key())
+    st.success("✅ Resume system ready")
+    
+    # 4. Check AutoGen team status
+    st.write("**Step 4: AutoGen Team Diagnostics**")
+    try:
+        st.success(f"✅ Team initialized with {system.participant_count} participants")
+        st.write(f"- Available agents: {list(system.agents.keys())}")
+        st.write(f"- Team type: {system.team_type}")
+    except Exception as e:
+        st.error(f"❌ AutoGen team check failed: {e}")
+    
+    st.write("**Step 5: Final Resume Processing**")
+
 async def process_final_resume(user_data, position_requirements, rewritten_example, user_feedback):
     """Process final resume with user feedback"""
     try:
-        st.write("🔍 **Diagnostic Information:**")
-        
-        # 1. Validate input data with detailed logging
-        st.write("**Step 1: Input Validation**")
+        # Validate input data
         if not user_data:
             st.error("❌ Missing user data")
             return None
@@ -385,77 +648,39 @@ async def process_final_resume(user_data, position_requirements, rewritten_examp
         if not rewritten_example:
             st.error("❌ Missing rewritten example")
             return None
-            
-        st.success("✅ All input data present")
-        st.write(f"- User data keys: {list(user_data.keys())}")
-        st.write(f"- Position req keys: {list(position_requirements.keys())}")
-        st.write(f"- Rewritten example keys: {list(rewritten_example.keys())}")
-        st.write(f"- User feedback length: {len(user_feedback) if user_feedback else 0}")
-        
-        # 2. Check event loop status
-        st.write("**Step 2: Event Loop Diagnostics**")
-        try:
-            import asyncio
-            current_loop = None
-            try:
-                current_loop = asyncio.get_running_loop()
-                st.warning(f"⚠️ Event loop already running: {current_loop}")
-                st.write("This may cause asyncio.run() conflicts")
-            except RuntimeError:
-                st.success("✅ No running event loop detected")
-        except Exception as e:
-            st.error(f"❌ Event loop check failed: {e}")
-        
-        # 3. System initialization check
-        st.write("**Step 3: System Initialization**")
-        if not await initialize_system():
-            st.error("❌ Failed to initialize system")
-            return None
-        st.success("✅ System initialization successful")
-        
-        # 4. Check system state
-        st.write("**Step 4: System State Validation**")
-        if not st.session_state.resume_system:
-            st.error("❌ Resume system not initialized in session state")
-            return None
-        st.success("✅ Resume system found in session state")
         
-        # 5. Check AutoGen team status
-        st.write("**Step 5: AutoGen Team Diagnostics**")
-        try:
-            team = st.session_state.resume_system.team
-            agents = st.session_state.resume_system.agents
-            # SelectorGroupChat uses _participants, not participants
-            participant_count = len(getattr(team, '_participants', []))
-            st.success(f"✅ Team initialized with {participant_count} participants")
-            st.write(f"- Available agents: {list(agents.keys())}")
-            st.write(f"- Team type: {type(team).__name__}")
-        except Exception as e:
-            st.error(f"❌ AutoGen team check failed: {e}")
+        if not check_api_key():
+            st.error("⚠️ OpenAI API key not found. Please set OPENAI_API_KEY environment variable or add it to Streamlit secrets.")
             return None
         
-        progress_placeholder = st.empty()
-        status_placeholder = st.empty()
+        if DEBUG:
+            display_final_resume_diagnostics(user_data, position_requirements, rewritten_example, user_feedback)
         
-        progress_placeholder.progress(0.1)
-        status_placeholder.info("🔄 Starting final processing...")
-        
-        progress_placeholder.progress(0.3)
-        status_placeholder.info("🔄 Calling create_final_resume...")
-        
-        # 6. Attempt the actual processing with timeout
-        st.write("**Step 6: Final Resume Processing**")
+        # Attempt the actual processing with timeout
         try:
-            # Add timeout to prevent hanging
-            result = await asyncio.wait_for(
-                st.session_state.resume_system.create_final_resume(
-                    user_data, position_requirements, rewritten_example, user_feedback
-                ),
-                timeout=300  # 5 minute timeout
-            )
+            with st.status("🔄 Creating final resume...", state="running", expanded=True) as status:
+                # The agent's text is shown as it is written; a cached result arrives without any
+                text_chunks = queue.Queue()
+                # A thread of its own, so a final resume never queues behind other sessions' calls
+                future = asyncio.ensure_future(asyncio.to_thread(
+                    cached_final_resume,
+                    build_cache_key(user_data, position_requirements, rewritten_example, user_feedback),
+                    user_data, position_requirements, rewritten_example, user_feedback,
+                    text_chunks.put
+                ))
+                placeholder = st.empty()
+                streamed_text = ""
+                while not future.done():
+                    await asyncio.sleep(0.1)
+                    new_text = drain_text_chunks(text_chunks)
+                    if new_text:
+                        streamed_text += new_text
+                        placeholder.markdown(streamed_text)
+                
+                # Raises asyncio.TimeoutError if the agents overrun (see cached_final_resume)
+                result = future.result()
+                status.update(label="✅ Final resume completed!", state="complete", expanded=False)
             
-            progress_placeholder.progress(1.0)
-            status_placeholder.success("✅ Final resume completed!")
             st.success("✅ Processing completed successfully!")
             
             return result
@@ -464,16 +689,17 @@ async def process_final_resume(user_data, position_requirements, rewritten_examp
             st.error("❌ Processing timed out after 5 minutes")
             return None
         except Exception as e:
+            logger.exception("Final resume processing failed")
             st.error(f"❌ Processing failed: {type(e).__name__}: {str(e)}")
-            import traceback
-            st.code(traceback.format_exc())
+            if DEBUG:
+                st.exception(e)
             return None
         
     except Exception as e:
+        logger.exception("Final resume preparation failed")
         st.error(f"❌ Diagnostic error: {type(e).__name__}: {str(e)}")
-        st.write("**Full error details:**")
-        import traceback
-        st.code(traceback.format_exc())
+        if DEBUG:
+            st.exception(e)
         return None
 
 def display_initial_scoring(scoring_result):
@@ -483,23 +709,21 @@ def display_initial_scoring(scoring_result):
     
     st.markdown('<h2 class="section-header">📊 Initial Example Scoring</h2>', unsafe_allow_html=True)
     
-    # Display scores
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        context_score = scoring_result.get('context_score', 0)
-        st.metric("Context Score", f"{context_score}/7", 
-                 delta=f"Target: ≥4", delta_color="normal" if context_score >= 4 else "inverse")
-    
-    with col2:
-        complexity_score = scoring_result.get('complexity_score', 0)
-        st.metric("Complexity Score", f"{complexity_score}/7",
-                 delta=f"Target: ≥4", delta_color="normal" if complexity_score >= 4 else "inverse")
-    
-    with col3:
-        initiative_score = scoring_result.get('initiative_score', 0)
-        st.metric("Initiative Score", f"{initiative_score}/7",
-                 delta=f"Target: ≥4", delta_color="normal" if initiative_score >= 4 else "inverse")
+    context_score = scoring_result.get('context_score', 0)
+    complexity_score = scoring_result.get('complexity_score', 0)
+    initiative_score = scoring_result.get('initiative_score', 0)
+    scores = [
+        ("Context", 'context', context_score),
+        ("Complexity", 'complexity', complexity_score),
+        ("Initiative", 'initiative', initiative_score)
+    ]
+    
+    # Display scores as a single table rather than one widget per score
+    score_table = "| Area | Score | Target | Status |\n|---|---|---|---|\n" + "\n".join(
+        f"| {label} | {score}/7 | ≥4 | {'✅ Meets' if score >= 4 else '⚠️ Below'} |"
+        for label, _, score in scores
+    )
+    st.markdown(score_table)
     
     # Overall assessment
     overall_score = (context_score + complexity_score + initiative_score) / 3
@@ -511,29 +735,33 @@ def display_initial_scoring(scoring_result):
     # Detailed feedback
     st.markdown("### 📝 Detailed Feedback")
     
-    with st.expander("Context Scoring Details"):
-        st.write(f"**Score:** {context_score}/7")
-        st.write(f"**Feedback:** {scoring_result.get('context_feedback', 'No feedback available')}")
-        if 'context_suggestions' in scoring_result:
-            st.write("**Suggestions:**")
-            for suggestion in scoring_result['context_suggestions']:
-                st.write(f"• {suggestion}")
-    
-    with st.expander("Complexity Scoring Details"):
-        st.write(f"**Score:** {complexity_score}/7")
-        st.write(f"**Feedback:** {scoring_result.get('complexity_feedback', 'No feedback available')}")
-        if 'complexity_suggestions' in scoring_result:
-            st.write("**Suggestions:**")
-            for suggestion in scoring_result['complexity_suggestions']:
-                st.write(f"• {suggestion}")
-    
-    with st.expander("Initiative Scoring Details"):
-        st.write(f"**Score:** {initiative_score}/7")
-        st.write(f"**Feedback:** {scoring_result.get('initiative_feedback', 'No feedback available')}")
-        if 'initiative_suggestions' in scoring_result:
-            st.write("**Suggestions:**")
-            for suggestion in scoring_result['initiative_suggestions']:
-                st.write(f"• {suggestion}")
+    for label, key, score in scores:
+        with st.expander(f"{label} Scoring Details"):
+            details = f"**Score:** {score}/7\n\n**Feedback:** {scoring_result.get(f'{key}_feedback', 'No feedback available')}"
+            if f'{key}_suggestions' in scoring_result:
+                details += "\n\n**Suggestions:**\n\n" + "\n".join(
+                    f"- {suggestion}" for suggestion in scoring_result[f'{key}_suggestions']
+                )
+            st.markdown(details)
+
+def build_score_metrics(improved_scores):
+    """Turn target scores into (label, value, delta, delta_color) metric arguments"""
+    metrics = []
+    for label, key in (("Context", 'context'), ("Complexity", 'complexity'), ("Initiative", 'initiative')):
+        score = improved_scores.get(key, 0)
+        metrics.append((
+            label,
+            f"{score}/7",
+            "Very Proficient" if score >= 6 else "Needs Enhancement",
+            "normal" if score >= 6 else "inverse"
+        ))
+    return metrics
+
+def display_score_metrics(metrics):
+    """Display a row of score metrics, one column per score"""
+    for column, (label, value, delta, delta_color) in zip(st.columns(len(metrics)), metrics):
+        with column:
+            st.metric(label, value, delta=delta, delta_color=delta_color)
 
 def display_rewritten_example(rewrite_result):
     """Display the rewritten example"""
@@ -602,12 +830,7 @@ def display_rewritten_example(rewrite_result):
     if has_structured_content:
         # LC4Q Category
         lc4q_category = rewrite_result.get('lc4q_category', 'Unknown')
-        category_colors = {
-            'Vision': '🔮',
-            'Results': '🎯',
-            'Accountability': '⚖️'
-        }
-        category_icon = category_colors.get(lc4q_category, '📋')
+        category_icon = CATEGORY_ICONS.get(lc4q_category, '📋')
         
         st.info(f"{category_icon} **Best LC4Q Fit:** {lc4q_category}")
         st.write(f"**Reasoning:** {rewrite_result.get('category_reasoning', 'No reasoning provided')}")
@@ -642,24 +865,7 @@ def display_rewritten_example(rewrite_result):
             # New scores
             if 'improved_scores' in rewrite_result:
                 st.markdown("### 📈 Target Scores (6-7 Level)")
-                improved_scores = rewrite_result['improved_scores']
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    score = improved_scores.get('context', 0)
-                    st.metric("Context", f"{score}/7",
-                             delta="Very Proficient" if score >= 6 else "Needs Enhancement",
-                             delta_color="normal" if score >= 6 else "inverse")
-                with col2:
-                    score = improved_scores.get('complexity', 0)
-                    st.metric("Complexity", f"{score}/7",
-                             delta="Very Proficient" if score >= 6 else "Needs Enhancement",
-                             delta_color="normal" if score >= 6 else "inverse")
-                with col3:
-                    score = improved_scores.get('initiative', 0)
-                    st.metric("Initiative", f"{score}/7",
-                             delta="Very Proficient" if score >= 6 else "Needs Enhancement",
-                             delta_color="normal" if score >= 6 else "inverse")
+                display_score_metrics(build_score_metrics(rewrite_result['improved_scores']))
     
     else:
         # Fallback: Show the actual agent content since structured extraction failed
@@ -728,11 +934,35 @@ def collect_user_feedback():
     
     return feedback
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_final_view(lc4q_category, rewritten_example, improvements, improved_scores):
+    """Derive the display values for the final example"""
+    # Keyed on the final example's display fields only; the full result also holds agent message objects
+    scores = build_score_metrics(improved_scores) if improved_scores is not None else None
+    
+    # Each block below is rendered as a single markdown element
+    star_markdown = "\n\n".join(
+        f"**{label}:**\n\n{rewritten_example.get(key, 'Not provided')}" for label, key in STAR_SECTIONS
+    )
+    improvements_markdown = "\n\n".join(f"✅ {improvement}" for improvement in improvements)
+    
+    return {
+        "lc4q_category": lc4q_category,
+        "category_icon": CATEGORY_ICONS.get(lc4q_category, '📋'),
+        "star_markdown": star_markdown,
+        "improvements_markdown": improvements_markdown,
+        "scores": scores
+    }
+
 def display_results(result):
     """Display the resume creation results"""
     if not result:
         return
     
+    final_example = result.get('final_example') or {}
+    lc4q_category = final_example.get('lc4q_category', 'Unknown')
+    feedback_applied = result.get('user_feedback_applied')
+    
     st.markdown('<h2 class="section-header">🎯 Your Final Resume</h2>', unsafe_allow_html=True)
     
     # Summary metrics
@@ -746,77 +976,36 @@ def display_results(result):
         st.metric("Status", "✅ Complete" if result.get('success', False) else "❌ Error")
     
     with col3:
-        final_example = result.get('final_example', {})
-        lc4q_category = final_example.get('lc4q_category', 'Unknown')
         st.metric("LC4Q Category", lc4q_category)
     
     # Display user feedback if applied
-    if result.get('user_feedback_applied'):
-        st.info(f"📝 **Applied Feedback:** {result['user_feedback_applied']}")
+    if feedback_applied:
+        st.info(f"📝 **Applied Feedback:** {feedback_applied}")
     
     # Display the final example
-    if 'final_example' in result and 'rewritten_example' in result['final_example']:
+    if 'rewritten_example' in final_example:
         st.markdown('<h3 class="section-header">📝 Your Enhanced STAR Example</h3>', unsafe_allow_html=True)
         
-        final_example = result['final_example']
-        rewritten_example = final_example['rewritten_example']
-        
-        # LC4Q Category with icon
-        lc4q_category = final_example.get('lc4q_category', 'Unknown')
-        category_colors = {
-            'Vision': '🔮',
-            'Results': '🎯',
-            'Accountability': '⚖️'
-        }
-        category_icon = category_colors.get(lc4q_category, '📋')
+        view = build_final_view(
+            lc4q_category,
+            final_example['rewritten_example'],
+            final_example.get('improvements_made') or [],
+            final_example.get('improved_scores')
+        )
         
-        st.success(f"{category_icon} **LC4Q Competency Area:** {lc4q_category}")
+        st.success(f"{view['category_icon']} **LC4Q Competency Area:** {view['lc4q_category']}")
         
         # Display the STAR example
-        st.markdown("#### 📋 Final STAR Structure")
-        
-        st.markdown("**Year, Rank, Location:**")
-        st.write(rewritten_example.get('year_rank_location', 'Not provided'))
-        
-        st.markdown("**Situation:**")
-        st.write(rewritten_example.get('situation', 'Not provided'))
-        
-        st.markdown("**Task:**")
-        st.write(rewritten_example.get('task', 'Not provided'))
-        
-        st.markdown("**Action:**")
-        st.write(rewritten_example.get('action', 'Not provided'))
-        
-        st.markdown("**Result:**")
-        st.write(rewritten_example.get('result', 'Not provided'))
+        st.markdown("#### 📋 Final STAR Structure\n\n" + view['star_markdown'])
         
         # Show improvements made
-        if 'improvements_made' in final_example and final_example['improvements_made']:
-            st.markdown("#### 🔧 Key Enhancements Applied")
-            for improvement in final_example['improvements_made']:
-                st.write(f"✅ {improvement}")
+        if view['improvements_markdown']:
+            st.markdown("#### 🔧 Key Enhancements Applied\n\n" + view['improvements_markdown'])
         
         # Show target scores
-        if 'improved_scores' in final_example:
+        if view['scores']:
             st.markdown("#### 📈 Target Performance Scores")
-            improved_scores = final_example['improved_scores']
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                score = improved_scores.get('context', 0)
-                st.metric("Context", f"{score}/7",
-                         delta="Very Proficient" if score >= 6 else "Needs Enhancement",
-                         delta_color="normal" if score >= 6 else "inverse")
-            with col2:
-                score = improved_scores.get('complexity', 0)
-                st.metric("Complexity", f"{score}/7",
-                         delta="Very Proficient" if score >= 6 else "Needs Enhancement",
-                         delta_color="normal" if score >= 6 else "inverse")
-            with col3:
-                score = improved_scores.get('initiative', 0)
-                st.metric("Initiative", f"{score}/7",
-                         delta="Very Proficient" if score >= 6 else "Needs Enhancement",
-                         delta_color="normal" if score >= 6 else "inverse")
+            display_score_metrics(view['scores'])
     
     else:
         st.warning("⚠️ No structured final example found in results.")
@@ -824,11 +1013,33 @@ def display_results(result):
         # Show agent conversation details in a collapsible section
         with st.expander("🤖 View Complete Agent Conversations", expanded=False):
             st.markdown("**Complete multi-agent conversation log:**")
-            for i, message in enumerate(result['messages']):
-                with st.expander(f"Message {i+1}: {getattr(message, 'source', 'Unknown')}"):
-                    st.write(f"**Content:** {getattr(message, 'content', 'No content')}")
-                    if hasattr(message, 'metadata'):
-                        st.write(f"**Metadata:** {message.metadata}")
+            # Long messages are cut short here; the full log is part of the download package below
+            st.caption(f"Each message is shown up to {MAX_MESSAGE_PREVIEW_CHARS:,} characters. "
+                       "The complete log is included in the JSON download.")
+            # The expander body runs even while collapsed, so the log is only built on request
+            if st.toggle("Load conversation log", key="show_conversation_log"):
+                messages = result.get('messages', [])
+                if len(messages) <= MESSAGES_PER_PAGE:
+                    # Expanders can't be nested, so short logs are shown one block per message
+                    for i, message in enumerate(messages):
+                        st.markdown(f"**Message {i+1}: {getattr(message, 'source', 'Unknown')}**\n\n"
+                                    f"{str(getattr(message, 'content', 'No content'))[:MAX_MESSAGE_PREVIEW_CHARS]}")
+                        if hasattr(message, 'metadata'):
+                            st.write(f"**Metadata:** {message.metadata}")
+                else:
+                    # Long conversations are paged into a single table rather than one element per message
+                    page_count = -(-len(messages) // MESSAGES_PER_PAGE)
+                    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+                    start = (page - 1) * MESSAGES_PER_PAGE
+                    st.dataframe(
+                        [
+                            {"message": i + 1,
+                             "source": str(getattr(message, 'source', 'Unknown')),
+                             "content": str(getattr(message, 'content', 'No content'))[:MAX_MESSAGE_PREVIEW_CHARS]}
+                            for i, message in enumerate(messages[start:start + MESSAGES_PER_PAGE], start=start)
+                        ],
+                        hide_index=True
+                    )
     
     # Success message and next steps
     st.markdown("---")
@@ -848,31 +1059,12 @@ def display_results(result):
     # Download option
     st.markdown('<h3 class="section-header">💾 Download Your Resume</h3>', unsafe_allow_html=True)
     
-    def make_json_serializable(obj):
-        """Recursively convert objects to JSON serializable format"""
-        if hasattr(obj, '__dict__'):
-            # Convert objects with attributes to dictionaries
-            return {key: make_json_serializable(value) for key, value in obj.__dict__.items()}
-        elif hasattr(obj, 'content') and hasattr(obj, 'source'):
-            # Handle message objects specifically
-            return {
-                "content": str(getattr(obj, 'content', '')),
-                "source": str(getattr(obj, 'source', 'Unknown')),
-                "object_type": str(type(obj).__name__)
-            }
-        elif isinstance(obj, dict):
-            return {key: make_json_serializable(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [make_json_serializable(item) for item in obj]
-        elif isinstance(obj, (str, int, float, bool, type(None))):
-            return obj
-        else:
-            # Convert any other object to string
-            return str(obj)
+    # Stamped once when the result was stored, so reruns keep the same file name and package
+    now = st.session_state.get('final_result_time') or datetime.now()
     
     # Prepare comprehensive download data
     raw_download_data = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "user_data": st.session_state.get('user_data', {}),
         "position_requirements": st.session_state.get('position_requirements', {}),
         "initial_scoring": st.session_state.get('initial_scoring', {}),
@@ -881,16 +1073,26 @@ def display_results(result):
         "final_result": result
     }
     
-    # Make everything JSON serializable
+    # Compact JSON is much faster to encode and smaller to send; indentation is opt-in
+    pretty = st.checkbox("Pretty-print JSON", value=False)
+    
     try:
-        download_data = make_json_serializable(raw_download_data)
-        json_data = json.dumps(download_data, indent=2)
+        if DEFERRED_DOWNLOADS:
+            # Serialised only when the button is clicked
+            json_data = lambda: build_download_package(raw_download_data, pretty)
+        else:
+            # Serialise once per result rather than on every rerun; its stamp and identity key the cache
+            json_data = serialize_download(
+                (now.isoformat(), id(result)),
+                raw_download_data,
+                pretty
+            )
         
         st.download_button(
             label="📥 Download Complete Resume Package (JSON)",
             data=json_data,
-            file_name=f"qps_resume_complete_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
+            file_name=f"qps_resume_complete_{now.strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json; charset=utf-8"
         )
     except Exception as e:
         st.error(f"❌ Error preparing download: {str(e)}")
@@ -899,18 +1101,18 @@ def display_results(result):
         # Provide a simplified download as fallback
         try:
             simplified_data = {
-                "timestamp": datetime.now().isoformat(),
-                "final_example": result.get('final_example', {}),
+                "timestamp": now.isoformat(),
+                "final_example": final_example,
                 "user_feedback": st.session_state.get('user_feedback', ''),
                 "note": "Simplified download due to serialization issues"
             }
-            simplified_json = json.dumps(simplified_data, indent=2)
+            simplified_json = dump_json(simplified_data, pretty)
             
             st.download_button(
                 label="📥 Download Simplified Resume Data (JSON)",
                 data=simplified_json,
-                file_name=f"qps_resume_simple_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
+                file_name=f"qps_resume_simple_{now.strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json; charset=utf-8"
             )
         except Exception as fallback_error:
             st.error(f"❌ Fallback download also failed: {str(fallback_error)}")
@@ -926,28 +1128,17 @@ def display_sidebar():
             st.success("✅ API Key Configured")
         else:
             st.error("❌ API Key Missing")
-        
-        # System status
-        if st.session_state.system_initialized:
-            st.success("✅ System Initialized")
-        else:
-            st.warning("⚠️ System Not Initialized")
+            if st.button("🔄 Reload Configuration"):
+                check_api_key.clear()
+                st.rerun()
         
         st.markdown("---")
         
         st.markdown("### 📋 Workflow Steps")
         
         # Show current stage
-        stages = {
-            'input': '📝 Step 1: Input Information',
-            'initial_scoring': '📊 Step 2: Initial Scoring', 
-            'rewrite': '✏️ Step 3: Improve Example',
-            'feedback': '💬 Step 4: Your Feedback',
-            'final': '🎯 Step 5: Final Resume'
-        }
-        
         current_stage = st.session_state.workflow_stage
-        for stage_key, stage_name in stages.items():
+        for stage_key, stage_name in WORKFLOW_STAGES:
             if stage_key == current_stage:
                 st.success(f"**{stage_name}** ← Current")
             else:
@@ -988,28 +1179,30 @@ def extract_final_resume_content(messages):
         if '{' in content and '}' in content:
             try:
                 # Try to extract JSON content
-                import re
-                json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content)
+                json_matches = JSON_OBJECT_PATTERN.findall(content[:MAX_JSON_SCAN_CHARS])
                 for json_str in json_matches:
                     try:
-                        parsed = json.loads(json_str)
+                        parsed = json_loads(json_str)
                         if isinstance(parsed, dict):
                             resume_content.update(parsed)
-                    except:
+                    except ValueError:
                         continue
-            except:
+            except TypeError:
+                # Non-text content (e.g. multimodal message parts) has no JSON to scan
                 pass
         
+        lower_content = content.lower()
+        
         # Look for STAR format content
-        if 'situation:' in content.lower() or 'task:' in content.lower() or 'action:' in content.lower() or 'result:' in content.lower():
+        if any(tag in lower_content for tag in STAR_TAGS):
             resume_content['star_example'] = content
         
         # Look for scoring content
-        if 'score' in content.lower() and ('context' in content.lower() or 'complexity' in content.lower() or 'initiative' in content.lower()):
+        if 'score' in lower_content and any(area in lower_content for area in SCORING_AREAS):
             resume_content['scoring_analysis'] = content
         
         # Look for competency analysis
-        if 'lc4q' in content.lower() or 'vision' in content.lower() or 'results' in content.lower() or 'accountability' in content.lower():
+        if any(term in lower_content for term in COMPETENCY_TERMS):
             resume_content['competency_analysis'] = content
     
     return resume_content if resume_content else None
@@ -1046,6 +1239,9 @@ def main():
     # Initialize session state
     initialize_session_state()
     
+    # Apply custom styling
+    inject_custom_css()
+    
     # Display header
     display_header()
     
@@ -1053,26 +1249,30 @@ def main():
     display_sidebar()
     
     # Main content - Enhanced workflow with stages
-    if st.session_state.workflow_stage == 'input':
-        display_input_stage()
-    elif st.session_state.workflow_stage == 'initial_scoring':
-        display_scoring_stage()
-    elif st.session_state.workflow_stage == 'rewrite':
-        display_rewrite_stage()
-    elif st.session_state.workflow_stage == 'feedback':
-        display_feedback_stage()
-    elif st.session_state.workflow_stage == 'final':
-        display_final_stage()
+    stage_handler = STAGE_HANDLERS.get(st.session_state.workflow_stage)
+    if stage_handler:
+        stage_handler()
 
 def display_input_stage():
     """Display the input collection stage"""
     st.markdown('<h1 class="main-header">📝 Step 1: Provide Your Information</h1>', unsafe_allow_html=True)
     
-    # Collect user data
-    user_data = collect_user_data()
+    # Choose how the position documents are provided
+    input_methods = select_input_methods()
     
-    # Collect position requirements
-    position_requirements = collect_position_requirements()
+    # Group the inputs in a form so typing doesn't rerun the page until submitted
+    with st.form("inputs"):
+        # Collect user data
+        user_data = collect_user_data()
+        
+        # Collect position requirements
+        position_requirements = collect_position_requirements(input_methods)
+        
+        # Next step button
+        submitted = st.form_submit_button("📊 Score My Example", type="primary", disabled=st.session_state.processing)
+    
+    if not submitted:
+        return
     
     # Validation
     if not user_data["job_example"] or not position_requirements["key_accountabilities"] or not position_requirements["position_description"] or not position_requirements["lc4q_competencies"]:
@@ -1082,11 +1282,8 @@ def display_input_stage():
     # Store in session state
     st.session_state.user_data = user_data
     st.session_state.position_requirements = position_requirements
-    
-    # Next step button
-    if st.button("📊 Score My Example", type="primary", disabled=st.session_state.processing):
-        st.session_state.workflow_stage = 'initial_scoring'
-        st.rerun()
+    st.session_state.workflow_stage = 'initial_scoring'
+    st.rerun()
 
 def display_scoring_stage():
     """Display the initial scoring stage"""
@@ -1098,33 +1295,10 @@ def display_scoring_stage():
             
             with st.spinner("Analyzing your example... This may take a minute."):
                 try:
-                    # Handle asyncio event loop conflicts
-                    try:
-                        loop = asyncio.get_running_loop()
-                        # Use thread approach if event loop exists
-                        import concurrent.futures
-                        
-                        def run_scoring_in_thread():
-                            new_loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(new_loop)
-                            try:
-                                return new_loop.run_until_complete(score_initial_example(
-                                    st.session_state.user_data,
-                                    st.session_state.position_requirements
-                                ))
-                            finally:
-                                new_loop.close()
-                        
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(run_scoring_in_thread)
-                            result = future.result(timeout=120)  # 2 minute timeout
-                            
-                    except RuntimeError:
-                        # No event loop running
-                        result = asyncio.run(score_initial_example(
-                            st.session_state.user_data,
-                            st.session_state.position_requirements
-                        ))
+                    result = run_stage_coroutine(score_initial_example(
+                        st.session_state.user_data,
+                        st.session_state.position_requirements
+                    ), timeout=120)  # 2 minute timeout
                     
                     st.session_state.initial_scoring = result
                     
@@ -1138,6 +1312,13 @@ def display_scoring_stage():
         # Display scoring results
         display_initial_scoring(st.session_state.initial_scoring)
         
+        if st.session_state.initial_scoring.get('success'):
+            prefetch_rewrite(
+                st.session_state.user_data,
+                st.session_state.position_requirements,
+                st.session_state.initial_scoring
+            )
+        
         # Next step buttons
         col1, col2 = st.columns(2)
         with col1:
@@ -1159,35 +1340,11 @@ def display_rewrite_stage():
             
             with st.spinner("Rewriting your example... This may take a few minutes."):
                 try:
-                    # Handle asyncio event loop conflicts
-                    try:
-                        loop = asyncio.get_running_loop()
-                        # Use thread approach if event loop exists
-                        import concurrent.futures
-                        
-                        def run_rewrite_in_thread():
-                            new_loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(new_loop)
-                            try:
-                                return new_loop.run_until_complete(rewrite_example(
-                                    st.session_state.user_data,
-                                    st.session_state.position_requirements,
-                                    st.session_state.initial_scoring
-                                ))
-                            finally:
-                                new_loop.close()
-                        
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(run_rewrite_in_thread)
-                            result = future.result(timeout=300)  # 5 minute timeout
-                            
-                    except RuntimeError:
-                        # No event loop running
-                        result = asyncio.run(rewrite_example(
-                            st.session_state.user_data,
-                            st.session_state.position_requirements,
-                            st.session_state.initial_scoring
-                        ))
+                    result = run_stage_coroutine(rewrite_example(
+                        st.session_state.user_data,
+                        st.session_state.position_requirements,
+                        st.session_state.initial_scoring
+                    ), timeout=300)  # 5 minute timeout
                     
                     st.session_state.rewritten_example = result
                     
@@ -1216,8 +1373,9 @@ def display_feedback_stage():
     """Display the user feedback stage"""
     st.markdown('<h1 class="main-header">💬 Step 4: Your Feedback</h1>', unsafe_allow_html=True)
     
-    # Show the rewritten example for reference
-    with st.expander("📖 Review Rewritten Example", expanded=False):
+    # Show the rewritten example for reference (only rendered when toggled on,
+    # since each edit of the feedback box reruns the page)
+    if st.toggle("📖 Review Rewritten Example", key="show_review"):
         display_rewritten_example(st.session_state.rewritten_example)
     
     # Collect feedback
@@ -1243,6 +1401,17 @@ def display_feedback_stage():
             st.session_state.workflow_stage = 'final'
             st.rerun()
 
+def start_over():
+    """Reset the workflow, including cached agent results (runs as a button callback)"""
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    
+    # Without this, resubmitting the same example would replay the previous answers
+    for cached_function in (cached_score_example, cached_rewrite_example, cached_final_resume, serialize_download):
+        cached_function.clear()
+    
+    st.session_state.workflow_stage = 'input'
+
 def display_final_stage():
     """Display the final processing stage"""
     st.markdown('<h1 class="main-header">🎯 Step 5: Final Resume</h1>', unsafe_allow_html=True)
@@ -1258,55 +1427,26 @@ def display_final_stage():
             st.session_state.processing = True
             
             with st.spinner("Creating your final resume... This may take several minutes."):
-                # Fix asyncio event loop conflict by using proper async handling
                 try:
-                    # Check if we're already in an event loop
-                    try:
-                        loop = asyncio.get_running_loop()
-                        st.warning("⚠️ Running in existing event loop - using create_task approach")
-                        # If we're in a loop, we need to use a different approach
-                        # Create a new thread to run the async function
-                        import concurrent.futures
-                        import threading
-                        
-                        def run_async_in_thread():
-                            # Create new event loop in thread
-                            new_loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(new_loop)
-                            try:
-                                return new_loop.run_until_complete(process_final_resume(
-                                    st.session_state.user_data,
-                                    st.session_state.position_requirements,
-                                    st.session_state.rewritten_example,
-                                    st.session_state.user_feedback
-                                ))
-                            finally:
-                                new_loop.close()
-                        
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(run_async_in_thread)
-                            result = future.result(timeout=600)  # 10 minute timeout
-                            
-                    except RuntimeError:
-                        # No event loop running, safe to use asyncio.run()
-                        st.info("✅ No existing event loop - using asyncio.run()")
-                        result = asyncio.run(process_final_resume(
-                            st.session_state.user_data,
-                            st.session_state.position_requirements,
-                            st.session_state.rewritten_example,
-                            st.session_state.user_feedback
-                        ))
+                    result = run_stage_coroutine(process_final_resume(
+                        st.session_state.user_data,
+                        st.session_state.position_requirements,
+                        st.session_state.rewritten_example,
+                        st.session_state.user_feedback
+                    ), timeout=600)  # 10 minute timeout
                     
                     st.session_state.final_result = result
+                    st.session_state.final_result_time = datetime.now()
                     st.success("✅ Processing completed! Results are displayed below.")
                     
                 except concurrent.futures.TimeoutError:
                     st.error("❌ Process timed out after 10 minutes. Please try again.")
                     st.session_state.final_result = None
                 except Exception as e:
+                    logger.exception("Final resume stage failed")
                     st.error(f"❌ Execution error: {type(e).__name__}: {str(e)}")
-                    import traceback
-                    st.code(traceback.format_exc())
+                    if DEBUG:
+                        st.exception(e)
                     st.session_state.final_result = None
             
             st.session_state.processing = False
@@ -1321,13 +1461,7 @@ def display_final_stage():
         st.markdown("---")
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("🔄 Start Over", type="secondary"):
-                # Reset all session state
-                for key in ['workflow_stage', 'initial_scoring', 'rewritten_example', 'user_feedback', 'final_result']:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.session_state.workflow_stage = 'input'
-                st.rerun()
+            st.button("🔄 Start Over", type="secondary", on_click=start_over)
         
         with col2:
             if st.button("💬 Provide More Feedback", type="primary"):
@@ -1335,5 +1469,14 @@ def display_final_stage():
                 st.session_state.final_result = None  # Clear to allow re-processing
                 st.rerun()
 
+# Workflow stage -> display function
+STAGE_HANDLERS = {
+    'input': display_input_stage,
+    'initial_scoring': display_scoring_stage,
+    'rewrite': display_rewrite_stage,
+    'feedback': display_feedback_stage,
+    'final': display_final_stage
+}
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,161 +7,216 @@ with different scenarios and validation.
 """
 
 import asyncio
+import functools
+import hashlib
 import json
 import os
-from typing import Dict
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
 
-from resume_system import ResumeWritingSystem
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from resume_system import ResumeWritingSystem, json_loads
+
+try:
+    from openai import DefaultAioHttpClient  # Optional: aiohttp transport (openai[aiohttp])
+except ImportError:
+    DefaultAioHttpClient = None
+
+
+# Per-scenario transcripts from run_all_tests, and how many queued lines are written per call
+LOG_DIR = Path(__file__).with_name("logs")
+LOG_BATCH_LINES = 64
+
+# Promotion scenarios run by the test suite, kept as data so they can be edited without touching code
+SCENARIOS_PATH = Path(__file__).with_name("scenarios.json")
+
+
+@functools.lru_cache(maxsize=1)
+def load_scenarios(mtime_ns: int) -> Dict[str, Dict]:
+    """Parse scenarios.json (keyed on its modification time, so edits are picked up)"""
+    return json_loads(SCENARIOS_PATH.read_bytes())
+
+
+def normalize_competencies(text: str) -> List[List[str]]:
+    """Reduce an LC4Q competency list to sorted [category, competency] pairs"""
+    pairs = set()
+    category = ""
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if line.startswith("- "):
+            pairs.add((category, line[2:].lower()))
+        elif line.endswith(":"):
+            category = line[:-1].lower()
+        elif line:
+            # Keep lines in any other format so differing free-form requirements never share a key
+            pairs.add((category, line.lower()))
+    return [list(pair) for pair in sorted(pairs)]
 
 
 class ResumeSystemTester:
     """Test harness for the resume writing system"""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = False, max_concurrent_requests: int = 4):
         """Initialize the tester"""
         self.system = None
+        self.api_key = None
+        # One connection pool shared by every system the tester creates, closed in teardown
+        self.http_client = None
+        # Upper bound on scenarios in flight at once in run_all_tests, to stay inside OpenAI rate limits
+        self.max_concurrent_requests = max_concurrent_requests
+        # Reuse stored create_resume results for identical inputs across runs
+        self.use_cache = use_cache
+        self.cache_dir = Path.home() / ".cache" / "qps_resume"
         
-    async def setup(self):
+    def setup(self):
         """Set up the testing environment"""
         # Load API key from environment
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
             print("⚠️  Warning: OPENAI_API_KEY not found in environment")
             print("   Set your API key: export OPENAI_API_KEY='your-key-here'")
         
         # Initialize system
-        self.system = ResumeWritingSystem(api_key=api_key)
+        self.http_client = self.create_http_client()
+        self.system = self.create_system()
         print("✅ Resume writing system initialized")
     
+    def create_http_client(self):
+        """Create the shared HTTP client, on the aiohttp transport when it is installed"""
+        if DefaultAioHttpClient:
+            # Sustains throughput better than the default httpx transport with many requests in flight
+            try:
+                return DefaultAioHttpClient()
+            except RuntimeError:
+                # Raised when openai is installed without the aiohttp extra
+                pass
+        # The SDK's own httpx defaults (timeouts, connection limits), but as one pool we can share
+        return DefaultAsyncHttpxClient()
+    
+    def create_system(self) -> ResumeWritingSystem:
+        """Create a resume system on the tester's shared connection pool"""
+        return ResumeWritingSystem(api_key=self.api_key, http_client=self.http_client)
+    
+    async def warm_up(self, timeout: float = 10):
+        """Warm up the API connection, e.g. while the menu waits for input"""
+        try:
+            await asyncio.wait_for(self.system.warm_up(), timeout=timeout)
+        except Exception:
+            # Best effort only: the first real request will set up the connection instead
+            pass
+    
     async def teardown(self):
         """Clean up after testing"""
         if self.system:
             await self.system.close()
             print("✅ System cleanup completed")
+        if self.http_client:
+            await self.http_client.aclose()
     
     def get_test_scenarios(self) -> Dict[str, Dict]:
         """Get different test scenarios"""
+        return load_scenarios(SCENARIOS_PATH.stat().st_mtime_ns)
+    
+    async def create_resume_cached(self, user_data: Dict, position_requirements: Dict) -> Dict:
+        """Create a resume, reusing the stored result for identical inputs when caching is enabled"""
+        if not self.use_cache:
+            return await self.system.create_resume(user_data, position_requirements)
         
-        scenarios = {
-            "senior_constable_to_sergeant": {
-                "user_data": {
-                    "job_example": """In 2023, as a Senior Constable at Brisbane Station, I was assigned to address rising community tensions in the multicultural Sunnybank area following several incidents between different ethnic groups. The situation required immediate intervention to prevent escalation while building long-term relationships. I coordinated with community leaders from Vietnamese, Chinese, and Pacific Islander communities to establish a regular dialogue forum, developed culturally appropriate engagement strategies, and trained 6 junior officers in cross-cultural communication techniques, resulting in a 40% reduction in reported community tensions over 6 months."""
-                },
-                "position_requirements": {
-                    "key_accountabilities": """- Lead strategic community engagement initiatives across Gold Coast district
-- Develop and mobilize team of 8 community liaison officers
-- Build and maintain enduring relationships with diverse community stakeholders  
-- Foster inclusive workplace that reflects community diversity
-- Demonstrate sound governance in program management and compliance
-- Drive accountability for community engagement metrics and KPIs""",
-                    
-                    "position_description": """POSITION: Sergeant - Community Engagement Team Leader
-LOCATION: Gold Coast District
-CLASSIFICATION: Police Officer - Sergeant
-REPORTS TO: Senior Sergeant - Operations
-
-OPERATIONAL REQUIREMENTS:
-- Supervise team of 8 community liaison officers
-- Manage district-wide community engagement programs
-- Coordinate with local government and community organizations
-- Oversee budget management for community programs ($200k annually)
-- Lead crisis communication and community response
-
-LOCATION FACTORS:
-- Gold Coast's diverse multicultural population
-- High tourist areas requiring specialized engagement
-- Rapid urban development and changing demographics
-- Strong community expectations for transparent policing""",
-                    
-                    "lc4q_competencies": """Vision:
-- Leads strategically
-- Stimulates ideas and innovation
-- Leads change in complex environments
-- Makes insightful decisions
-
-Results:
-- Develops and mobilises talent
-- Builds enduring relationships
-- Inspires others
-- Drives accountability and outcomes
-
-Accountability:
-- Fosters healthy and inclusive workplaces
-- Pursues continuous growth
-- Demonstrates sound governance"""
-                }
-            },
-            
-            "constable_to_senior_constable": {
-                "user_data": {
-                    "job_example": """In 2023, as a Constable at Ipswich Station, I was assigned to address increasing traffic incidents on the Warrego Highway corridor during peak hours. The situation involved multiple serious accidents causing significant delays and public safety concerns. I developed and implemented a proactive traffic enforcement strategy, coordinating with Transport and Main Roads Queensland to identify high-risk areas, established mobile enforcement points during peak periods, and delivered road safety education programs to three local schools. This resulted in a 25% reduction in serious traffic incidents and earned recognition from the District Traffic Coordinator for innovative problem-solving."""
-                },
-                "position_requirements": {
-                    "key_accountabilities": """- Lead traffic safety initiatives and enforcement strategies in Brisbane metropolitan area
-- Mentor and develop 2-3 junior officers in traffic enforcement techniques
-- Build relationships with transport authorities and road safety stakeholders
-- Maintain professional standards in all traffic enforcement activities
-- Demonstrate sound judgment in discretionary enforcement decisions""",
-                    
-                    "position_description": """POSITION: Senior Constable - Traffic Enforcement Specialist
-LOCATION: Brisbane Metropolitan District
-CLASSIFICATION: Police Officer - Senior Constable
-REPORTS TO: Sergeant - Traffic Operations
-
-OPERATIONAL REQUIREMENTS:
-- Conduct specialized traffic enforcement operations
-- Investigate serious traffic incidents and crashes
-- Provide mentoring to 2-3 junior officers
-- Deliver road safety education programs to schools and community groups
-- Operate specialized traffic enforcement equipment
-
-LOCATION FACTORS:
-- Brisbane's complex metropolitan traffic environment
-- High-volume intersections and highway corridors
-- Diverse road user demographics
-- Integration with council and transport authority initiatives""",
-                    
-                    "lc4q_competencies": """Vision:
-- Stimulates ideas and innovation
-- Makes insightful decisions
-
-Results:
-- Develops and mobilises talent
-- Builds enduring relationships
-
-Accountability:
-- Pursues continuous growth
-- Demonstrates sound governance"""
-                }
-            }
+        # Competency lists are keyed by their structure, so formatting and ordering differences still hit
+        key_requirements = {
+            **position_requirements,
+            "lc4q_competencies": normalize_competencies(position_requirements.get("lc4q_competencies", ""))
         }
+        key = hashlib.blake2b(
+            json.dumps([user_data, key_requirements], sort_keys=True).encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        cache_file = self.cache_dir / f"{key}.json"
+        if cache_file.exists():
+            print("♻️  Using cached result for identical inputs")
+            return json.loads(cache_file.read_text(encoding="utf-8"))
         
-        return scenarios
+        result = await self.system.create_resume(user_data, position_requirements)
+        # Agent message objects are reduced to source and content so the result can be stored as JSON
+        stored = {
+            **result,
+            "messages": [
+                {"source": getattr(message, 'source', 'Unknown'), "content": str(getattr(message, 'content', ''))}
+                for message in result["messages"]
+            ]
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+        return stored
     
-    async def test_scenario(self, scenario_name: str, scenario_data: Dict):
-        """Test a specific scenario"""
-        print(f"\n{'='*60}")
-        print(f"🧪 TESTING SCENARIO: {scenario_name}")
-        print(f"{'='*60}")
+    async def write_log(self, log_queue: asyncio.Queue, log_path: Path):
+        """Write queued lines to a log file in batches until a None sentinel arrives"""
+        with open(log_path, "a", encoding="utf-8") as log_file:
+            done = False
+            while not done:
+                batch = [await log_queue.get()]
+                while len(batch) < LOG_BATCH_LINES and not log_queue.empty():
+                    batch.append(log_queue.get_nowait())
+                lines = [line for line in batch if line is not None]
+                if lines:
+                    await asyncio.to_thread(log_file.write, "".join(lines))
+                done = len(lines) < len(batch)
+    
+    async def test_scenario(self, scenario_name: str, scenario_data: Dict, system: Optional[ResumeWritingSystem] = None, log_dir: Optional[Path] = None):
+        """Test a specific scenario, writing its transcript to log_dir/<scenario_name>.log if given"""
+        system = system or self.system
+        
+        # Concurrent scenarios each log to their own file rather than sharing the terminal
+        log_queue = None
+        if log_dir is not None:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            log_queue = asyncio.Queue()
+            writer = asyncio.create_task(self.write_log(log_queue, log_dir / f"{scenario_name}.log"))
+        emit = (lambda line: log_queue.put_nowait(f"{line}\n")) if log_queue else print
         
         try:
             # Extract data
             user_data = scenario_data["user_data"]
             position_requirements = scenario_data["position_requirements"]
             
-            print(f"💼 Job Example: {user_data['job_example'][:100]}...")
-            
-            print(f"\n🚀 Starting resume creation process...")
-            print(f"{'─'*60}")
+            # The whole banner goes out in one write
+            emit("\n".join([
+                f"\n{'='*60}",
+                f"🧪 TESTING SCENARIO: {scenario_name}",
+                f"{'='*60}",
+                f"💼 Job Example: {user_data['job_example'][:100]}...",
+                "\n🚀 Starting resume creation process...",
+                f"{'─'*60}"
+            ]))
             
             # Run the resume creation
-            await self.system.create_resume_with_console(user_data, position_requirements)
+            if log_queue:
+                async for item in system.create_resume_stream(user_data, position_requirements):
+                    if isinstance(item, ModelClientStreamingChunkEvent):
+                        # Token chunks are repeated in full by the message that follows them
+                        continue
+                    if isinstance(item, TaskResult):
+                        emit(f"\n🏁 Stop reason: {item.stop_reason}")
+                    else:
+                        emit(f"---------- {type(item).__name__} ({getattr(item, 'source', 'Unknown')}) ----------\n"
+                             f"{item.to_text()}")
+            else:
+                await system.create_resume_with_console(user_data, position_requirements)
             
-            print(f"\n✅ Scenario '{scenario_name}' completed successfully!")
+            emit(f"\n✅ Scenario '{scenario_name}' completed successfully!")
             
         except Exception as e:
-            print(f"\n❌ Error in scenario '{scenario_name}': {str(e)}")
+            emit(f"\n❌ Error in scenario '{scenario_name}': {str(e)}")
             raise
+        
+        finally:
+            if log_queue:
+                log_queue.put_nowait(None)
+                await writer
     
     async def run_quick_test(self):
         """Run a quick test with minimal output"""
@@ -187,7 +242,7 @@ Accountability:
         }
         
         try:
-            result = await self.system.create_resume(user_data, position_requirements)
+            result = await self.create_resume_cached(user_data, position_requirements)
             print(f"✅ Quick test completed successfully!")
             print(f"📊 Messages exchanged: {result['total_turns']}")
             print(f"🏁 Stop reason: {result['stop_reason']}")
@@ -196,22 +251,139 @@ Accountability:
             print(f"❌ Quick test failed: {str(e)}")
     
     async def run_all_tests(self):
-        """Run all test scenarios"""
+        """Run all test scenarios concurrently"""
         print("\n🧪 RUNNING ALL TEST SCENARIOS")
         print("="*50)
+        print(f"📝 Scenario transcripts are written to {LOG_DIR}/<scenario>.log")
         
         scenarios = self.get_test_scenarios()
+        # Scenarios are dominated by API latency, so they run together, capped to respect rate limits
+        scenario_limit = asyncio.Semaphore(self.max_concurrent_requests)
+        failures = {}
         
-        for scenario_name, scenario_data in scenarios.items():
-            try:
-                await self.test_scenario(scenario_name, scenario_data)
+        async def run_scenario(scenario_name: str, scenario_data: Dict):
+            async with scenario_limit:
+                # A team can only run one task at a time, so each scenario gets its own system
+                system = self.create_system()
+                try:
+                    await self.test_scenario(scenario_name, scenario_data, system, log_dir=LOG_DIR)
+                except Exception as e:
+                    # Recorded rather than raised, so one failing scenario doesn't cancel the others
+                    failures[scenario_name] = e
+                finally:
+                    await system.close()
+        
+        # The task group cancels and awaits every scenario if the run itself is interrupted
+        async with asyncio.TaskGroup() as task_group:
+            for scenario_name, scenario_data in scenarios.items():
+                task_group.create_task(run_scenario(scenario_name, scenario_data))
+        
+        for scenario_name in scenarios:
+            if scenario_name in failures:
+                print(f"❌ {scenario_name}: FAILED - {str(failures[scenario_name])}")
+            else:
                 print(f"✅ {scenario_name}: PASSED")
-            except Exception as e:
-                print(f"❌ {scenario_name}: FAILED - {str(e)}")
-                continue
         
         print(f"\n{'='*50}")
         print("🏁 All tests completed!")
+    
+    async def run_all_tests_batch(self, poll_interval: float = 30):
+        """Score every scenario through the OpenAI Batch API (half price, but can take up to 24 hours)"""
+        print("\n📦 RUNNING ALL SCENARIOS IN BATCH MODE")
+        print("="*50)
+        
+        # Each conversation turn depends on the previous reply, so only the independent
+        # scoring requests can be planned ahead and submitted as one batch
+        scenarios = self.get_test_scenarios()
+        lines = []
+        for scenario_name, scenario_data in scenarios.items():
+            requests = self.system.build_scoring_requests(
+                scenario_data["user_data"],
+                scenario_data["position_requirements"]
+            )
+            for agent_name, body in requests.items():
+                lines.append(json.dumps({
+                    "custom_id": f"{scenario_name}:{agent_name}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body
+                }))
+        
+        client = AsyncOpenAI(api_key=self.api_key)
+        try:
+            batch_file = await client.files.create(
+                file=("scenarios.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            print(f"🚀 Submitted batch {batch.id} with {len(lines)} requests")
+            
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                await asyncio.sleep(poll_interval)
+                batch = await client.batches.retrieve(batch.id)
+                print(f"⏳ Batch status: {batch.status}")
+            
+            if batch.status != "completed" or not batch.output_file_id:
+                print(f"❌ Batch ended with status: {batch.status}")
+                return
+            
+            output = await client.files.content(batch.output_file_id)
+        finally:
+            await client.close()
+        
+        # Group the replies by scenario; failed requests are left out and fall back to default scores
+        responses = {scenario_name: {} for scenario_name in scenarios}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            scenario_name, agent_name = record["custom_id"].rsplit(":", 1)
+            responses[scenario_name][agent_name] = response["body"]["choices"][0]["message"]["content"]
+        
+        for scenario_name, replies in responses.items():
+            if not replies:
+                print(f"❌ {scenario_name}: FAILED - no scoring replies returned")
+                continue
+            scores = self.system.score_from_responses(replies)
+            print(f"✅ {scenario_name}: PASSED - Context {scores['context_score']}/7, "
+                  f"Complexity {scores['complexity_score']}/7, Initiative {scores['initiative_score']}/7")
+        
+        print(f"\n{'='*50}")
+        print("🏁 Batch scoring completed!")
+
+
+async def read_input(prompt: str) -> str:
+    """Read a line from stdin without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    line = loop.create_future()
+    
+    def deliver(setter, value):
+        # The wait may have been cancelled (Ctrl-C) by the time the line arrives
+        if not line.done():
+            setter(value)
+    
+    def read_line():
+        try:
+            outcome = (line.set_result, input(prompt))
+        except Exception as e:
+            outcome = (line.set_exception, e)
+        try:
+            loop.call_soon_threadsafe(deliver, *outcome)
+        except RuntimeError:
+            # The loop has closed, so nothing is waiting for this line any more
+            pass
+    
+    # A daemon thread rather than the default executor, which asyncio.run joins on exit
+    # and would leave Ctrl-C hanging until Enter is pressed
+    threading.Thread(target=read_line, name="stdin-reader", daemon=True).start()
+    return (await line).strip()
 
 
 async def main():
@@ -219,20 +391,26 @@ async def main():
     print("🧪 QPS Resume Writing System - Test Suite")
     print("="*50)
     
-    # Initialize tester
-    tester = ResumeSystemTester()
+    # Initialize tester (set RESUME_TEST_CACHE=true to reuse results for unchanged inputs)
+    tester = ResumeSystemTester(
+        use_cache=os.getenv("RESUME_TEST_CACHE", "false").lower() in ("1", "true", "yes")
+    )
     
     try:
         # Set up
-        await tester.setup()
+        tester.setup()
+        # Connect to the API in the background while the user picks a mode
+        warm_up = asyncio.create_task(tester.warm_up())
         
         # Get user choice
         print("\nSelect test mode:")
         print("1. Quick test (fast validation)")
         print("2. Single scenario test")
         print("3. All scenarios test")
+        print("4. Batch scoring of all scenarios (OpenAI Batch API)")
         
-        choice = input("\nEnter choice (1-3): ").strip()
+        choice = await read_input("\nEnter choice (1-4): ")
+        await warm_up
         
         if choice == "1":
             await tester.run_quick_test()
@@ -242,7 +420,7 @@ async def main():
             for i, name in enumerate(scenarios.keys(), 1):
                 print(f"{i}. {name}")
             
-            scenario_choice = input(f"\nSelect scenario (1-{len(scenarios)}): ").strip()
+            scenario_choice = await read_input(f"\nSelect scenario (1-{len(scenarios)}): ")
             try:
                 scenario_index = int(scenario_choice) - 1
                 scenario_name = list(scenarios.keys())[scenario_index]
@@ -251,10 +429,13 @@ async def main():
                 print("❌ Invalid scenario selection")
         elif choice == "3":
             await tester.run_all_tests()
+        elif choice == "4":
+            await tester.run_all_tests_batch()
         else:
             print("❌ Invalid choice")
     
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # asyncio.run turns Ctrl-C into a cancellation of this task
         print("\n⚠️  Test interrupted by user")
     except Exception as e:
         print(f"❌ Test suite error: {str(e)}")